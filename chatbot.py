@@ -1,60 +1,155 @@
 import pandas as pd
-import seaborn as sn
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from flask import Flask, request, render_template_string, jsonify
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import make_pipeline
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import requests
+from requests.adapters import HTTPAdapter
 import re
-import json
+import gzip
+import hashlib
+import functools
+import time
+import queue
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import os
+import tempfile
+import joblib
+import scipy.sparse
 from datetime import datetime
-import nltk
-from textblob import TextBlob
 import logging
 
+try:
+    from sparse_dot_topn import sp_matmul_topn
+except ImportError:
+    sp_matmul_topn = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Download required NLTK data
-try:
-    nltk.download('punkt', quiet=True)
-    nltk.download('stopwords', quiet=True)
-    nltk.download('wordnet', quiet=True)
-except:
-    pass
+# Fitted TF-IDF artifacts, reused across restarts while newer than the dataset and this script
+DATASET_PATH = 'Medicine_Details_Final.csv'
+VECTORIZER_CACHE_PATH = 'tfidf_vectorizer.joblib'
+TFIDF_CACHE_PATH = 'tfidf_matrix.npz'
+
+# English stop words plus query filler and the 'Not available' placeholder for missing fields
+STOP_WORDS = sorted(ENGLISH_STOP_WORDS | {'available', 'medicine', 'medicines', 'use', 'used', 'uses'})
+
+# Text columns concatenated into the searchable document for each medicine
+TEXT_COLUMNS = ['Medicine Name', 'Uses', 'Composition', 'Side_effects', 'Manufacturer']
+
+# Storage fields only ever rendered as text, so they are read as strings too
+STORAGE_COLUMNS = ['Storage Condition', 'Storage Temperature (°C)', 'Storage Humidity (%)']
+
+# On-disk OpenFDA response cache shared across restarts and workers
+FDA_CACHE_DIR = '.fda_cache'
+FDA_CACHE_TTL = 86400  # seconds before an entry is revalidated with its ETag
+
+# Number of most common medicine names whose OpenFDA details are prefetched when serving starts.
+# Kept small because unauthenticated OpenFDA access is rate limited per IP.
+FDA_PREWARM_COUNT = 100
+FDA_PREWARM = os.environ.get('FDA_PREWARM', '1') != '0'  # set FDA_PREWARM=0 to skip the prefetch
+
+# Returned by OpenFDA queries answered with 304 Not Modified
+_NOT_MODIFIED = object()
+
+# OpenFDA request limits: (connect, read) timeouts in seconds, each applied per attempt
+FDA_REQUEST_TIMEOUT = (2, 2)
+FDA_MAX_RETRIES = 1
+
+# Shared HTTP session so OpenFDA calls reuse pooled keep-alive connections
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=FDA_MAX_RETRIES))
+
+# Runs OpenFDA lookups alongside local response formatting
+_fda_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='fda')
+# Worst case for one lookup: every attempt hits both timeouts (DNS resolution is not bounded by either)
+FDA_WAIT_TIMEOUT = (1 + FDA_MAX_RETRIES) * sum(FDA_REQUEST_TIMEOUT)
+# Caps queued + running lookups, so an unreachable OpenFDA can't make every chat request wait out the timeout
+_fda_slots = threading.BoundedSemaphore(16)
+
+def _atomic_write(path, write):
+    """Write a file through a temp file in the same directory, so concurrent readers never see it half-written"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=f'.{os.path.basename(path)}.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
 class AdvancedMedicineChatbot:
+    # Response sections per query intent, formatted against a medicine row
+    _SECTION_TEMPLATES = {
+        'composition': "**🧪 Composition:** {Composition}\n\n",
+        'usage': "**🎯 Uses:** {Uses}\n\n",
+        'side_effects': "**⚠️ Side Effects:** {Side_effects}\n\n",
+        'storage': "**📦 Storage:** {Storage Condition} at {Storage Temperature (°C)}°C, {Storage Humidity (%)}% humidity\n\n"
+    }
+    _INTENT_SECTIONS = {intent: (template,) for intent, template in _SECTION_TEMPLATES.items()}
+    _INTENT_SECTIONS['general'] = tuple(_SECTION_TEMPLATES.values())
+    
     def __init__(self):
         self.load_dataset()
         self.setup_vectorizer()
         self.setup_medical_keywords()
-        self.conversation_history = []
+        self.setup_caches()
+        # Bounded so long-running processes don't accumulate history forever
+        self.conversation_history = deque(maxlen=200)
         
     def load_dataset(self):
         """Load and preprocess the medicine dataset"""
         try:
-            self.data = pd.read_csv('Medicine_Details_Final.csv')
+            string_columns = TEXT_COLUMNS + STORAGE_COLUMNS
+            if pyarrow is not None:
+                # Multithreaded parse straight into Arrow-backed columns
+                self.data = pd.read_csv(DATASET_PATH, engine='pyarrow', dtype_backend='pyarrow',
+                                        dtype={col: 'string[pyarrow]' for col in string_columns})
+            else:
+                self.data = pd.read_csv(DATASET_PATH, dtype={col: 'string' for col in string_columns})
             logger.info(f"Loaded {len(self.data)} medicines from dataset")
             
-            # Clean and preprocess data
-            self.data = self.data.fillna('Not available')
+            # Clean and preprocess data; only string columns, Arrow integer columns reject text fill values
+            self.data[string_columns] = self.data[string_columns].fillna('Not available')
             
             # Create enhanced combined text for better matching
-            self.data['combined'] = (
-                self.data['Medicine Name'] + ' ' + 
-                self.data['Uses'] + ' ' + 
-                self.data['Composition'] + ' ' +
-                self.data['Side_effects'] + ' ' +
-                self.data['Manufacturer']
-            )
+            first, *rest = TEXT_COLUMNS
+            self.data['combined'] = self.data[first].str.cat([self.data[col] for col in rest], sep=' ', na_rep='')
+            
+            # OpenFDA lookup key: the lowercased first word of the medicine name
+            self.data['_fda_key'] = self.data['Medicine Name'].str.strip().str.replace(r'\s.*', '', regex=True).str.lower()
             
-            # Create searchable keywords
-            self.data['keywords'] = self.data['combined'].str.lower()
+            # Plain dict rows for cheap per-match lookups on the query path
+            self._rows = self.data.to_dict('records')
             
         except FileNotFoundError:
-            logger.error("Medicine_Details_Final.csv not found!")
+            logger.error(f"{DATASET_PATH} not found!")
             raise
         except Exception as e:
             logger.error(f"Error loading dataset: {e}")
@@ -62,16 +157,59 @@ class AdvancedMedicineChatbot:
     
     def setup_vectorizer(self):
         """Initialize and fit the TF-IDF vectorizer"""
-        self.vectorizer = TfidfVectorizer(
-            stop_words='english',
-            max_features=5000,
-            ngram_range=(1, 2),
-            min_df=1,
-            max_df=0.95
-        )
-        self.tfidf_matrix = self.vectorizer.fit_transform(self.data['combined'])
+        if not self.load_cached_vectorizer():
+            # Stateless hashing keeps no vocabulary in memory; IDF weights are learned on top
+            self.vectorizer = make_pipeline(
+                HashingVectorizer(
+                    stop_words=STOP_WORDS,
+                    n_features=2**20,
+                    ngram_range=(1, 1),
+                    alternate_sign=False,
+                    norm=None,
+                    dtype=np.float32
+                ),
+                # Rows come out L2-normalized, so cosine similarity is a plain sparse dot product
+                TfidfTransformer(norm='l2', sublinear_tf=True)
+            )
+            self.tfidf_matrix = self.vectorizer.fit_transform(self.data['combined']).tocsr()
+            self.save_cached_vectorizer()
+        
+        self.tfidf_matrix_T = self.tfidf_matrix.T.tocsr()
         logger.info("TF-IDF vectorizer initialized")
     
+    def load_cached_vectorizer(self):
+        """Load the fitted vectorizer and TF-IDF matrix from disk if they are still fresh"""
+        try:
+            cache_mtime = min(os.path.getmtime(VECTORIZER_CACHE_PATH), os.path.getmtime(TFIDF_CACHE_PATH))
+            source_mtime = max(os.path.getmtime(DATASET_PATH), os.path.getmtime(__file__))
+            if cache_mtime <= source_mtime:
+                return False
+            
+            tfidf_matrix = scipy.sparse.load_npz(TFIDF_CACHE_PATH).tocsr()
+            # mtimes can lie (cp -p, archive extraction); a row-count mismatch means a different dataset
+            if tfidf_matrix.shape[0] != len(self.data):
+                logger.warning("Cached TF-IDF matrix does not match the dataset, refitting")
+                return False
+            
+            self.vectorizer = joblib.load(VECTORIZER_CACHE_PATH)
+            self.tfidf_matrix = tfidf_matrix
+            logger.info("Loaded cached TF-IDF vectorizer")
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.error(f"Error loading cached vectorizer: {e}")
+            return False
+    
+    def save_cached_vectorizer(self):
+        """Persist the fitted vectorizer and TF-IDF matrix for faster restarts"""
+        try:
+            # gunicorn workers may fit and save at the same time on first start
+            _atomic_write(VECTORIZER_CACHE_PATH, lambda f: joblib.dump(self.vectorizer, f))
+            _atomic_write(TFIDF_CACHE_PATH, lambda f: scipy.sparse.save_npz(f, self.tfidf_matrix))
+        except Exception as e:
+            logger.error(f"Error caching vectorizer: {e}")
+    
     def setup_medical_keywords(self):
         """Setup medical terminology and common queries"""
         self.medical_keywords = {
@@ -89,23 +227,110 @@ class AdvancedMedicineChatbot:
             'storage': ['store', 'storage', 'keep', 'preserve'],
             'composition': ['ingredient', 'composition', 'contain', 'made of']
         }
-    
-    def preprocess_query(self, query):
-        """Enhanced query preprocessing"""
-        query = query.lower().strip()
         
-        # Remove common question words
-        query = re.sub(r'\b(what|how|when|where|why|can|could|should|would|is|are|do|does)\b', '', query)
+        # Query preprocessing patterns, compiled once; case-insensitive since the vectorizer lowercases itself
+        self._stopword_re = re.compile(r'\b(what|how|when|where|why|can|could|should|would|is|are|do|does)\b', re.IGNORECASE)
         
         # Handle common misspellings and variations
-        corrections = {
+        self._corrections = {
             'paracetamol': 'acetaminophen',
             'asprin': 'aspirin',
             'ibuprofin': 'ibuprofen'
         }
+        self._corr_re = re.compile('|'.join(map(re.escape, self._corrections)), re.IGNORECASE)
+        
+        # General advice for common conditions
+        self.advice_db = {
+            'headache': "For headaches, you can try:\n• Rest in a quiet, dark room\n• Apply cold or warm compress\n• Stay hydrated\n• Consider over-the-counter pain relievers like acetaminophen or ibuprofen\n• If severe or persistent, consult a doctor",
+            'fever': "For fever management:\n• Stay hydrated with plenty of fluids\n• Rest and avoid strenuous activities\n• Use fever reducers like acetaminophen or ibuprofen\n• Dress lightly and keep room cool\n• Seek medical attention if fever exceeds 103°F (39.4°C)",
+            'cold': "For common cold:\n• Get plenty of rest\n• Drink warm liquids\n• Use saline nasal drops\n• Consider throat lozenges\n• Humidify the air\n• Most colds resolve in 7-10 days",
+            'cough': "For cough relief:\n• Stay hydrated\n• Use honey (for adults)\n• Try warm salt water gargle\n• Use humidifier\n• Avoid irritants like smoke\n• See doctor if cough persists over 2 weeks"
+        }
+        
+        # Single-pass keyword matchers, each match maps back to (priority, label)
+        self._intent_matcher = self._build_keyword_matcher(
+            (keyword, intent)
+            for intent, keywords in self.query_patterns.items()
+            for keyword in keywords
+        )
+        self._advice_matcher = self._build_keyword_matcher((condition, condition) for condition in self.advice_db)
+    
+    @staticmethod
+    def _build_keyword_matcher(keyword_labels):
+        """Index (keyword, label) pairs in an Aho-Corasick automaton, or first-character buckets without pyahocorasick"""
+        automaton = ahocorasick.Automaton() if ahocorasick is not None else None
+        buckets = defaultdict(list)
+        labels = {}
+        for keyword, label in keyword_labels:
+            # Earlier labels win, matching the order the keyword tables are declared in
+            priority = labels.setdefault(label, len(labels))
+            if automaton is not None:
+                automaton.add_word(keyword, (priority, label))
+            else:
+                buckets[keyword[0]].append((keyword, (priority, label)))
+        
+        if automaton is None:
+            return dict(buckets)
+        automaton.make_automaton()
+        return automaton
+    
+    @staticmethod
+    def _first_label(matcher, text):
+        """Return the highest-priority label whose keyword occurs in text, or None"""
+        if isinstance(matcher, dict):
+            # Only keywords starting with a character present in text can match
+            hits = (
+                value
+                for char in set(text) if char in matcher
+                for keyword, value in matcher[char] if keyword in text
+            )
+        else:
+            hits = (value for _, value in matcher.iter(text))
+        best = min(hits, default=None)
+        return best[1] if best else None
+    
+    def setup_caches(self):
+        """Memoize the pure per-query helpers, since chat traffic repeats queries often"""
+        self.preprocess_query = functools.lru_cache(maxsize=1024)(self.preprocess_query)
+        self.analyze_query_intent = functools.lru_cache(maxsize=1024)(self.analyze_query_intent)
+        self._match_cached = functools.lru_cache(maxsize=512)(self._rank_matches)
+        self._format_medicine_sections = functools.lru_cache(maxsize=4096)(self._format_medicine_sections)
+        # No LRU in front of the FDA store: it would keep serving entries past their TTL.
+        # Without diskcache, a plain dict holds the same entries for this process only.
+        self._fda_store = diskcache.Cache(FDA_CACHE_DIR) if diskcache is not None else {}
+    
+    def warm_fda_cache(self, limit=FDA_PREWARM_COUNT, workers=10):
+        """Prefetch OpenFDA details for the most common medicine names in the background"""
+        pending = queue.SimpleQueue()
+        for clean_name in self.data['_fda_key'].value_counts().index[:limit]:
+            pending.put(clean_name)
+        
+        # Daemon threads, so neither startup nor shutdown waits on the prefetch
+        for i in range(workers):
+            threading.Thread(target=self._warm_fda, args=(pending,), name=f'fda-warm-{i}', daemon=True).start()
+    
+    def _warm_fda(self, pending):
+        """Populate the FDA cache for queued names until the queue is drained, ignoring failures"""
+        while True:
+            try:
+                clean_name = pending.get_nowait()
+            except queue.Empty:
+                return
+            
+            try:
+                self._fetch_fda(clean_name)
+            except Exception as e:
+                logger.debug("FDA prefetch failed for %s: %s", clean_name, e)
+    
+    def preprocess_query(self, query):
+        """Enhanced query preprocessing"""
+        query = query.strip()
+        
+        # Remove common question words
+        query = self._stopword_re.sub('', query)
         
-        for wrong, correct in corrections.items():
-            query = query.replace(wrong, correct)
+        # Fix common misspellings in a single pass
+        query = self._corr_re.sub(lambda m: self._corrections[m.group(0).lower()], query)
         
         return query.strip()
     
@@ -113,118 +338,161 @@ class AdvancedMedicineChatbot:
         """Determine the intent of the user's query"""
         query_lower = query.lower()
         
-        for intent, keywords in self.query_patterns.items():
-            if any(keyword in query_lower for keyword in keywords):
-                return intent
-        
-        return 'general'
+        return self._first_label(self._intent_matcher, query_lower) or 'general'
+    
+    def _top_k_similar(self, user_vector, top_k, threshold):
+        """Return indices and scores of the top_k rows scoring above threshold, best first"""
+        if sp_matmul_topn is not None:
+            # Fused sparse matmul + top-k, never materializes the dense score row
+            result = sp_matmul_topn(user_vector, self.tfidf_matrix_T, top_n=top_k, threshold=threshold, sort=True)
+            return result.indices, result.data
+        
+        sims = (user_vector @ self.tfidf_matrix_T).toarray()[0]
+        
+        # Partial selection of the top_k, then rank only those
+        top_k = min(top_k, len(sims))
+        part = np.argpartition(sims, -top_k)[-top_k:]
+        part = part[sims[part] > threshold]
+        part = part[np.argsort(-sims[part], kind='stable')]
+        return part, sims[part]
+    
+    def _rank_matches(self, query, top_k):
+        """Return (index, similarity) pairs for the top medicine matches"""
+        processed_query = self.preprocess_query(query)
+        user_vector = self.vectorizer.transform([processed_query])
+        top_indices, top_scores = self._top_k_similar(user_vector, top_k, threshold=0.1)
+        return tuple(zip(top_indices, top_scores))
     
     def get_medicine_matches(self, query, top_k=3):
         """Get top medicine matches using TF-IDF similarity"""
         try:
-            processed_query = self.preprocess_query(query)
-            user_vector = self.vectorizer.transform([processed_query])
-            similarities = cosine_similarity(user_vector, self.tfidf_matrix)
-            
-            # Get top matches
-            top_indices = similarities[0].argsort()[-top_k:][::-1]
             matches = []
             
-            for idx in top_indices:
-                if similarities[0][idx] > 0.1:  # Minimum similarity threshold
-                    matches.append({
-                        'index': idx,
-                        'similarity': similarities[0][idx],
-                        'medicine': self.data.iloc[idx]
-                    })
+            for idx, score in self._match_cached(query, top_k):
+                matches.append({
+                    'index': idx,
+                    'similarity': score,
+                    'medicine': self._rows[idx]
+                })
             
             return matches
         except Exception as e:
             logger.error(f"Error in matching: {e}")
             return []
     
-    def get_openfda_details(self, medicine_name):
+    def get_openfda_details(self, medicine_name, clean_name=None):
         """Fetch additional details from OpenFDA API"""
         try:
-            # Clean medicine name for API query
-            clean_name = medicine_name.split()[0].lower()
-            url = f"https://api.fda.gov/drug/label.json?search={clean_name}&limit=1"
-            
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                drug_data = response.json()
-                if 'results' in drug_data and drug_data['results']:
-                    result = drug_data['results'][0]
-                    
-                    fda_info = {}
-                    fda_info['indications'] = result.get('indications_and_usage', ['Not available'])[0] if result.get('indications_and_usage') else 'Not available'
-                    fda_info['warnings'] = result.get('warnings', ['Not available'])[0] if result.get('warnings') else 'Not available'
-                    fda_info['dosage'] = result.get('dosage_and_administration', ['Not available'])[0] if result.get('dosage_and_administration') else 'Not available'
-                    fda_info['contraindications'] = result.get('contraindications', ['Not available'])[0] if result.get('contraindications') else 'Not available'
-                    
-                    return fda_info
-            
-            return None
+            # Clean medicine name for API query, unless the precomputed key is given
+            if clean_name is None:
+                clean_name = medicine_name.split()[0].strip().lower()
+            return self._fetch_fda(clean_name)
         except Exception as e:
             logger.error(f"FDA API error: {e}")
             return None
     
+    def _fetch_fda(self, clean_name):
+        """Return OpenFDA details for a cleaned medicine name, preferring the cached entry while fresh"""
+        # Entries are (fetched_at, etag, fda_info); fda_info may legitimately be None
+        entry = self._fda_store.get(clean_name)
+        if not isinstance(entry, tuple):
+            entry = None
+        elif time.time() - entry[0] < FDA_CACHE_TTL:
+            return entry[2]
+        
+        # Stale or missing: revalidate stale entries so unchanged labels come back as a bodiless 304
+        try:
+            fda_info, etag = self._query_fda(clean_name, etag=entry[1] if entry else None)
+        except Exception as e:
+            if entry is None:
+                raise
+            # Better a day-old label than none while OpenFDA is unreachable
+            logger.warning(f"FDA revalidation failed for {clean_name}, serving stale entry: {e}")
+            return entry[2]
+        if fda_info is _NOT_MODIFIED:
+            fda_info = entry[2]
+        self._fda_store[clean_name] = (time.time(), etag, fda_info)
+        return fda_info
+    
+    def _query_fda(self, clean_name, etag=None):
+        """Query OpenFDA for a cleaned medicine name, returning (fda_info, etag); raises on transient failures so they aren't cached"""
+        url = f"https://api.fda.gov/drug/label.json?search={clean_name}&limit=1"
+        headers = {'If-None-Match': etag} if etag else None
+        
+        response = _session.get(url, headers=headers, timeout=FDA_REQUEST_TIMEOUT)
+        if response.status_code == 304:
+            return _NOT_MODIFIED, etag
+        
+        etag = response.headers.get('ETag')
+        if response.status_code == 200:
+            drug_data = orjson.loads(response.content) if orjson is not None else response.json()
+            if 'results' in drug_data and drug_data['results']:
+                result = drug_data['results'][0]
+                
+                fda_info = {}
+                fda_info['indications'] = result.get('indications_and_usage', ['Not available'])[0] if result.get('indications_and_usage') else 'Not available'
+                fda_info['warnings'] = result.get('warnings', ['Not available'])[0] if result.get('warnings') else 'Not available'
+                fda_info['dosage'] = result.get('dosage_and_administration', ['Not available'])[0] if result.get('dosage_and_administration') else 'Not available'
+                fda_info['contraindications'] = result.get('contraindications', ['Not available'])[0] if result.get('contraindications') else 'Not available'
+                
+                return fda_info, etag
+        elif response.status_code != 404:  # 404 means no label matched
+            response.raise_for_status()
+        
+        return None, etag
+    
+    def _format_medicine_sections(self, index, intent):
+        """Format the dataset-derived part of a medicine's response, which depends only on row and intent"""
+        medicine = self._rows[index]
+        
+        parts = [f"## 💊 {medicine['Medicine Name']}\n\n"]
+        parts += [template.format_map(medicine) for template in self._INTENT_SECTIONS.get(intent, ())]
+        parts.append(f"**🏭 Manufacturer:** {medicine['Manufacturer']}\n\n")
+        return ''.join(parts)
+    
     def format_medicine_info(self, medicine_data, intent='general', fda_data=None):
         """Format medicine information based on query intent"""
-        medicine = medicine_data['medicine']
-        
-        response = f"## 💊 {medicine['Medicine Name']}\n\n"
-        
-        if intent == 'composition' or intent == 'general':
-            response += f"**🧪 Composition:** {medicine['Composition']}\n\n"
-        
-        if intent == 'usage' or intent == 'general':
-            response += f"**🎯 Uses:** {medicine['Uses']}\n\n"
-        
-        if intent == 'side_effects' or intent == 'general':
-            response += f"**⚠️ Side Effects:** {medicine['Side_effects']}\n\n"
-        
-        if intent == 'storage' or intent == 'general':
-            response += f"**📦 Storage:** {medicine['Storage Condition']} at {medicine['Storage Temperature (°C)']}°C, {medicine['Storage Humidity (%)']}% humidity\n\n"
-        
-        response += f"**🏭 Manufacturer:** {medicine['Manufacturer']}\n\n"
+        return self._format_medicine_sections(medicine_data['index'], intent) + self._format_fda_and_confidence(medicine_data, fda_data)
+    
+    def _format_fda_and_confidence(self, medicine_data, fda_data):
+        """Format the FDA block and confidence line that follow a medicine's dataset sections"""
+        parts = []
         
         # Add FDA information if available
         if fda_data:
-            response += "### 🏛️ FDA Information:\n"
+            parts.append("### 🏛️ FDA Information:\n")
             if fda_data['indications'] != 'Not available':
-                response += f"**Indications:** {fda_data['indications'][:200]}...\n\n"
+                parts.append(f"**Indications:** {fda_data['indications'][:200]}...\n\n")
             if fda_data['warnings'] != 'Not available':
-                response += f"**⚠️ FDA Warnings:** {fda_data['warnings'][:200]}...\n\n"
+                parts.append(f"**⚠️ FDA Warnings:** {fda_data['warnings'][:200]}...\n\n")
         
         # Add confidence score
         confidence = int(medicine_data['similarity'] * 100)
-        response += f"*Confidence: {confidence}%*"
+        parts.append(f"*Confidence: {confidence}%*")
         
-        return response
+        return ''.join(parts)
     
     def get_general_medical_advice(self, query):
         """Provide general medical advice for common queries"""
-        advice_db = {
-            'headache': "For headaches, you can try:\n• Rest in a quiet, dark room\n• Apply cold or warm compress\n• Stay hydrated\n• Consider over-the-counter pain relievers like acetaminophen or ibuprofen\n• If severe or persistent, consult a doctor",
-            'fever': "For fever management:\n• Stay hydrated with plenty of fluids\n• Rest and avoid strenuous activities\n• Use fever reducers like acetaminophen or ibuprofen\n• Dress lightly and keep room cool\n• Seek medical attention if fever exceeds 103°F (39.4°C)",
-            'cold': "For common cold:\n• Get plenty of rest\n• Drink warm liquids\n• Use saline nasal drops\n• Consider throat lozenges\n• Humidify the air\n• Most colds resolve in 7-10 days",
-            'cough': "For cough relief:\n• Stay hydrated\n• Use honey (for adults)\n• Try warm salt water gargle\n• Use humidifier\n• Avoid irritants like smoke\n• See doctor if cough persists over 2 weeks"
-        }
-        
         query_lower = query.lower()
-        for condition, advice in advice_db.items():
-            if condition in query_lower:
-                return f"## General Advice for {condition.title()}\n\n{advice}\n\n**⚠️ Disclaimer:** This is general information only. Always consult healthcare professionals for proper diagnosis and treatment."
+        
+        condition = self._first_label(self._advice_matcher, query_lower)
+        if condition:
+            advice = self.advice_db[condition]
+            return f"## General Advice for {condition.title()}\n\n{advice}\n\n**⚠️ Disclaimer:** This is general information only. Always consult healthcare professionals for proper diagnosis and treatment."
         
         return None
     
     def generate_response(self, user_input):
         """Generate comprehensive response to user query"""
+        # Blank or non-text input has nothing to match; skip the pipeline entirely
+        if not isinstance(user_input, str) or not user_input.strip():
+            return "Please enter a valid question."
+        
         try:
             # Store conversation
             self.conversation_history.append({
-                'timestamp': datetime.now(),
+                'timestamp': time.time(),
                 'user_input': user_input,
                 'type': 'user'
             })
@@ -246,21 +514,42 @@ class AdvancedMedicineChatbot:
                     # Get the best match
                     best_match = matches[0]
                     
-                    # Fetch FDA data for the best match
-                    fda_data = self.get_openfda_details(best_match['medicine']['Medicine Name'])
+                    # Start fetching FDA data for the best match while the local parts are formatted,
+                    # unless earlier lookups are still stuck and have used up every slot
+                    medicine = best_match['medicine']
+                    fda_future = None
+                    if _fda_slots.acquire(blocking=False):
+                        fda_future = _fda_executor.submit(
+                            self.get_openfda_details, medicine['Medicine Name'], clean_name=medicine['_fda_key']
+                        )
+                        fda_future.add_done_callback(lambda _: _fda_slots.release())
                     
-                    # Format response
-                    response = self.format_medicine_info(best_match, intent, fda_data)
+                    # Dataset-derived sections don't depend on the FDA result
+                    sections = self._format_medicine_sections(best_match['index'], intent)
                     
                     # Add alternative suggestions if available
+                    alternatives = ""
                     if len(matches) > 1:
-                        response += f"\n\n### 🔍 You might also be interested in:\n"
+                        alternatives += f"\n\n### 🔍 You might also be interested in:\n"
                         for match in matches[1:]:
-                            response += f"• **{match['medicine']['Medicine Name']}** - {match['medicine']['Uses'][:100]}...\n"
+                            alternatives += f"• **{match['medicine']['Medicine Name']}** - {match['medicine']['Uses'][:100]}...\n"
+                    
+                    fda_data = None
+                    if fda_future is not None:
+                        try:
+                            fda_data = fda_future.result(timeout=FDA_WAIT_TIMEOUT)
+                        except FutureTimeoutError:
+                            # The lookup keeps running and fills the cache for later queries
+                            logger.warning(f"FDA lookup timed out for {medicine['Medicine Name']}")
+                    else:
+                        logger.warning(f"FDA lookups backed up, skipping {medicine['Medicine Name']}")
+                    
+                    # Format response
+                    response = sections + self._format_fda_and_confidence(best_match, fda_data) + alternatives
             
             # Store bot response
             self.conversation_history.append({
-                'timestamp': datetime.now(),
+                'timestamp': time.time(),
                 'response': response,
                 'type': 'bot'
             })
@@ -296,8 +585,23 @@ class AdvancedMedicineChatbot:
 # Initialize the chatbot
 chatbot = AdvancedMedicineChatbot()
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, which serializes straight to bytes"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default), mimetype=self.mimetype)
+
 # Initialize Flask app
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 CORS(app)
 
 # Enhanced HTML template with modern UI
@@ -724,9 +1028,23 @@ html_template = """
 </html>
 """
 
+# The home page has no template variables, so render and compress it once
+_RENDERED_HOME = app.jinja_env.from_string(html_template).render().encode()
+_RENDERED_HOME_GZ = gzip.compress(_RENDERED_HOME)
+_HOME_ETAG = hashlib.sha1(_RENDERED_HOME).hexdigest()
+
 @app.route('/')
 def home():
-    return render_template_string(html_template)
+    if request.accept_encodings.quality('gzip') > 0:
+        response = Response(_RENDERED_HOME_GZ, mimetype='text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(f'{_HOME_ETAG}-gz')
+    else:
+        response = Response(_RENDERED_HOME, mimetype='text/html')
+        response.set_etag(_HOME_ETAG)
+    response.vary.add('Accept-Encoding')
+    # Answers revalidation with an empty 304 when the browser's copy is current
+    return response.make_conditional(request)
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -752,4 +1070,10 @@ def health_check():
 
 if __name__ == '__main__':
     logger.info("Starting Advanced Medicine Chatbot...")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Prefetch only when serving, so importing the module has no network side effects
+    if FDA_PREWARM:
+        chatbot.warm_fda_cache()
+    # Development server only; in production run behind gunicorn, e.g.
+    #   gunicorn -w 2 -k gthread --threads 16 --keep-alive 30 -b 0.0.0.0:5000 chatbot:app
+    # (gunicorn.conf.py in this directory starts the prefetch in the first worker)
+    app.run(host='0.0.0.0', port=5000, threaded=True)
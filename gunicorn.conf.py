@@ -0,0 +1,9 @@
+"""Gunicorn hooks for the chatbot; picked up automatically when gunicorn runs from this directory"""
+
+
+def post_worker_init(worker):
+    # Only the first worker prefetches OpenFDA details: the on-disk cache shares them with the rest,
+    # and the API is rate limited per IP. Respawned workers have a higher age and skip it too.
+    import chatbot
+    if chatbot.FDA_PREWARM and worker.age == 1:
+        chatbot.chatbot.warm_fda_cache()